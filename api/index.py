@@ -3,27 +3,69 @@ Main API server for the backend.
 Self-coded with tab autocompletion in Cursor + GPT-5-Codex.
 """
 
+import asyncio
+import hmac
 import json
+import os
 import sqlite3
 from pathlib import Path
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, Type, TypeVar
 
 from fastapi import Depends, FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.templating import Jinja2Templates
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 import uvicorn
 
+from api.profiling import profile_in_progress, sample_for
+from api.rate_limit import RateLimitMiddleware, rate_limiter_from_env
 from models.county_data import (
+    ALLOWED_MEASURES,
+    MEASURE_KEYS,
     CountyDataRequest,
     CountyDataResponse,
     CountyHealthRecord,
+    CountyProfile,
+    CountyProfileRequest,
+    CountyProfileResponse,
+    MeasureStatistics,
+    TypedCountyDataResponse,
+    TypedCountyHealthRecord,
 )
 
 
 app = FastAPI()
 
+RATE_LIMITED_PATHS = ("/county_data", "/v2/county_data", "/county_profile")
+
+rate_limiter = rate_limiter_from_env()
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    paths=RATE_LIMITED_PATHS,
+    trust_forwarded_for=os.environ.get("RATE_LIMIT_TRUST_FORWARDED_FOR") == "1",
+    api_keys=[
+        key.strip()
+        for key in os.environ.get("RATE_LIMIT_API_KEYS", "").split(",")
+        if key.strip()
+    ],
+)
+
 templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
 
+county_data_adapter = TypeAdapter(CountyDataResponse)
+typed_county_data_adapter = TypeAdapter(TypedCountyDataResponse)
+
+STATISTICS_FIELDS = tuple(MeasureStatistics.model_fields)
+MEASURE_NAMES = {key: name for name, key in MEASURE_KEYS.items()}
+
+RequestModel = TypeVar("RequestModel", CountyDataRequest, CountyProfileRequest)
+
+# Single-flight state: one in-flight future per identical lookup key.
+_in_flight: Dict[Hashable, "asyncio.Future[Optional[bytes]]"] = {}
+coalescing_metrics: Dict[str, int] = {"requests": 0, "executions": 0, "coalesced": 0}
+
 
 def get_database_path() -> Path:
     return Path("data.db")
@@ -39,49 +81,235 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "coalescing": dict(coalescing_metrics),
+        "rate_limit": dict(rate_limiter.metrics) if rate_limiter else None,
+    }
+
+
+def storage_keys(payload: CountyDataRequest) -> Tuple[int, int]:
+    """Translate a validated request into the integer keys used by the DB."""
+    return int(payload.zip), MEASURE_KEYS[payload.measure_name]
+
+
 def query_county_data(db_path: Path, payload: CountyDataRequest) -> CountyDataResponse:
     connection = sqlite3.connect(db_path)
     connection.row_factory = sqlite3.Row
 
     query = """
         SELECT
-            chr.State AS state,
-            chr.County AS county,
-            chr.State_code AS state_code,
-            chr.County_code AS county_code,
-            chr.Year_span AS year_span,
-            chr.Measure_name AS measure_name,
-            chr.Measure_id AS measure_id,
-            chr.Numerator AS numerator,
-            chr.Denominator AS denominator,
-            chr.Raw_value AS raw_value,
-            chr.Confidence_Interval_Lower_Bound AS confidence_interval_lower_bound,
-            chr.Confidence_Interval_Upper_Bound AS confidence_interval_upper_bound,
-            chr.Data_Release_Year AS data_release_year,
-            chr.fipscode AS fipscode
-        FROM county_health_rankings chr
-        JOIN zip_county zc ON chr.County = zc.county AND chr.State = zc.state_abbreviation
-        WHERE zc.zip = ? AND chr.Measure_name = ?
-        ORDER BY chr.Year_span
+            c.state AS state,
+            c.county AS county,
+            c.state_code AS state_code,
+            c.county_code AS county_code,
+            f.year_span AS year_span,
+            f.measure_id AS measure_id,
+            f.numerator AS numerator,
+            f.denominator AS denominator,
+            f.raw_value AS raw_value,
+            f.confidence_interval_lower_bound AS confidence_interval_lower_bound,
+            f.confidence_interval_upper_bound AS confidence_interval_upper_bound,
+            f.data_release_year AS data_release_year,
+            c.fipscode AS fipscode
+        FROM zip_fips z
+        JOIN county_health_facts f ON f.fips = z.fips
+        JOIN counties c ON c.fips = f.fips
+        WHERE z.zip = ? AND f.measure_key = ?
+        ORDER BY f.year_span, f.fips
     """
 
     try:
-        cursor = connection.execute(query, (payload.zip, payload.measure_name))
+        cursor = connection.execute(query, storage_keys(payload))
         rows = cursor.fetchall()
     finally:
         connection.close()
 
-    return [CountyHealthRecord(**dict(row)) for row in rows]
+    return [
+        CountyHealthRecord(**dict(row), measure_name=payload.measure_name)
+        for row in rows
+    ]
 
 
-async def parse_county_data_request(request: Request) -> CountyDataRequest:
+def query_typed_county_data(
+    db_path: Path, payload: CountyDataRequest
+) -> TypedCountyDataResponse:
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+
+    query = """
+        SELECT
+            c.state,
+            c.county,
+            c.state_code,
+            c.county_code,
+            t.year_span,
+            t.measure_id,
+            t.numerator,
+            t.denominator,
+            t.raw_value,
+            t.confidence_interval_lower_bound,
+            t.confidence_interval_upper_bound,
+            t.data_release_year,
+            c.fipscode,
+            t.county_rank,
+            ms.county_count,
+            ms.min,
+            ms.max,
+            ms.mean,
+            ms.p10,
+            ms.p25,
+            ms.p50,
+            ms.p75,
+            ms.p90
+        FROM zip_fips z
+        JOIN county_health_rankings_typed t ON t.fips = z.fips
+        JOIN counties c ON c.fips = t.fips
+        LEFT JOIN measure_statistics ms
+            ON ms.measure_key = t.measure_key AND ms.year_span = t.year_span
+        WHERE z.zip = ? AND t.measure_key = ?
+        ORDER BY t.year_span, t.fips
+    """
+
+    try:
+        cursor = connection.execute(query, storage_keys(payload))
+        rows = cursor.fetchall()
+    finally:
+        connection.close()
+
+    records = []
+    for row in rows:
+        values = dict(row, measure_name=payload.measure_name)
+        statistics = {field: values.pop(field) for field in STATISTICS_FIELDS}
+        if statistics["county_count"] is not None:
+            values["statistics"] = MeasureStatistics(**statistics)
+        records.append(TypedCountyHealthRecord(**values))
+    return records
+
+
+def query_county_profile(db_path: Path, zip_code: str) -> Optional[CountyProfileResponse]:
+    """Fetch every measure series for a ZIP's counties in one query and pivot by year."""
+    connection = sqlite3.connect(db_path)
+
+    query = """
+        SELECT
+            c.fips,
+            c.state,
+            c.county,
+            c.state_code,
+            c.county_code,
+            c.fipscode,
+            f.measure_key,
+            f.year_span,
+            f.raw_value
+        FROM zip_fips z
+        JOIN counties c ON c.fips = z.fips
+        JOIN county_health_facts f ON f.fips = z.fips
+        WHERE z.zip = ?
+        ORDER BY c.fips, f.year_span, f.data_release_year
+    """
+
+    try:
+        rows = connection.execute(query, (int(zip_code),)).fetchall()
+    finally:
+        connection.close()
+
+    if not rows:
+        return None
+
+    years = sorted({row[7] for row in rows})
+    year_index = {year: index for index, year in enumerate(years)}
+
+    counties: Dict[int, dict] = {}
+    for row in rows:
+        fips, state, county, state_code, county_code, fipscode = row[:6]
+        measure_key, year_span, raw_value = row[6:]
+        profile = counties.get(fips)
+        if profile is None:
+            profile = counties[fips] = {
+                "state": state,
+                "county": county,
+                "state_code": state_code,
+                "county_code": county_code,
+                "fipscode": fipscode,
+                "measures": {name: [None] * len(years) for name in ALLOWED_MEASURES},
+            }
+        # Rows are ordered by release year, so a later release overwrites an earlier one.
+        profile["measures"][MEASURE_NAMES[measure_key]][year_index[year_span]] = (
+            parse_raw_value(raw_value)
+        )
+
+    return CountyProfileResponse(
+        zip=zip_code,
+        years=years,
+        counties=[CountyProfile(**profile) for profile in counties.values()],
+    )
+
+
+def parse_raw_value(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def single_flight(
+    key: Hashable, compute: Callable[[], Awaitable[Optional[bytes]]]
+) -> Optional[bytes]:
+    """Run ``compute`` once per key; concurrent callers share its result."""
+    coalescing_metrics["requests"] += 1
+
+    pending = _in_flight.get(key)
+    if pending is None:
+        # The shared work runs in its own task so no caller's cancellation,
+        # including the one that started it, cancels it for the others.
+        pending = asyncio.ensure_future(compute())
+        _in_flight[key] = pending
+        coalescing_metrics["executions"] += 1
+
+        def finished(task: "asyncio.Future[Optional[bytes]]") -> None:
+            if _in_flight.get(key) is task:
+                del _in_flight[key]
+            # Mark the exception as retrieved in case every caller went away.
+            if not task.cancelled():
+                task.exception()
+
+        pending.add_done_callback(finished)
+    else:
+        coalescing_metrics["coalesced"] += 1
+
+    return await asyncio.shield(pending)
+
+
+async def fetch_county_data(
+    db_path: Path, payload: CountyDataRequest, typed: bool = False
+) -> Optional[bytes]:
+    """Return the serialized records for a lookup, or None when nothing matched."""
+    query = query_typed_county_data if typed else query_county_data
+    adapter = typed_county_data_adapter if typed else county_data_adapter
+
+    async def compute() -> Optional[bytes]:
+        results = await run_in_threadpool(query, db_path, payload)
+        if not results:
+            return None
+        return adapter.dump_json(results)
+
+    key = ("county_data", typed, str(db_path), payload.zip, payload.measure_name)
+    return await single_flight(key, compute)
+
+
+async def parse_request_model(request: Request, model: Type[RequestModel]) -> RequestModel:
     try:
         data = await request.json()
     except json.JSONDecodeError as exc:
         raise HTTPException(status_code=422, detail="Invalid JSON payload") from exc
 
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+
     try:
-        return CountyDataRequest(**data)
+        return model(**data)
     except ValidationError as exc:
         message = exc.errors()[0]["msg"] if exc.errors() else "Invalid request"
         if message.startswith("Value error, "):
@@ -89,12 +317,15 @@ async def parse_county_data_request(request: Request) -> CountyDataRequest:
         raise HTTPException(status_code=400, detail=message) from exc
 
 
-@app.post("/county_data", response_model=CountyDataResponse)
-async def county_data_endpoint(
-    request: Request,
-    body: CountyDataRequest = Depends(parse_county_data_request),
-    db_path: Path = Depends(get_database_path),
-):
+async def parse_county_data_request(request: Request) -> CountyDataRequest:
+    return await parse_request_model(request, CountyDataRequest)
+
+
+async def parse_county_profile_request(request: Request) -> CountyProfileRequest:
+    return await parse_request_model(request, CountyProfileRequest)
+
+
+def validate_county_data_body(body: CountyDataRequest) -> None:
     if body.coffee == "teapot":
         raise HTTPException(status_code=status.HTTP_418_IM_A_TEAPOT, detail="I'm a teapot")
 
@@ -104,15 +335,98 @@ async def county_data_endpoint(
     if not body.measure_name:
         raise HTTPException(status_code=400, detail="Missing required field: measure_name")
 
-    results = query_county_data(db_path, body)
 
-    if not results:
+@app.post("/county_data", response_model=CountyDataResponse)
+async def county_data_endpoint(
+    request: Request,
+    body: CountyDataRequest = Depends(parse_county_data_request),
+    db_path: Path = Depends(get_database_path),
+):
+    validate_county_data_body(body)
+
+    content = await fetch_county_data(db_path, body)
+
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No data found for provided zip and measure",
+        )
+
+    return Response(content=content, media_type="application/json")
+
+
+@app.post("/v2/county_data", response_model=TypedCountyDataResponse)
+async def typed_county_data_endpoint(
+    request: Request,
+    body: CountyDataRequest = Depends(parse_county_data_request),
+    db_path: Path = Depends(get_database_path),
+):
+    validate_county_data_body(body)
+
+    content = await fetch_county_data(db_path, body, typed=True)
+
+    if content is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No data found for provided zip and measure",
         )
 
-    return results
+    return Response(content=content, media_type="application/json")
+
+
+@app.post("/county_profile", response_model=CountyProfileResponse)
+async def county_profile_endpoint(
+    request: Request,
+    body: CountyProfileRequest = Depends(parse_county_profile_request),
+    db_path: Path = Depends(get_database_path),
+):
+    async def compute() -> Optional[bytes]:
+        profile = await run_in_threadpool(query_county_profile, db_path, body.zip)
+        return None if profile is None else profile.model_dump_json().encode()
+
+    content = await single_flight(("county_profile", str(db_path), body.zip), compute)
+
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No data found for provided zip",
+        )
+
+    return Response(content=content, media_type="application/json")
+
+
+def require_admin(request: Request) -> None:
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected:
+        # Admin routes do not exist unless a token has been configured.
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    provided = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(provided.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_endpoint(seconds: float = 10.0, interval_ms: float = 5.0):
+    if not 0 < seconds <= 60:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 60]")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be in [1, 1000]")
+    if profile_in_progress():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="A profile is already running"
+        )
+
+    sampler = await sample_for(seconds, interval_ms / 1000)
+
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "Content-Disposition": 'attachment; filename="profile.folded"',
+            "X-Profile-Samples": str(sampler.samples),
+            "X-Profile-Seconds": f"{sampler.elapsed:.3f}",
+        },
+    )
 
 
 @app.exception_handler(ValueError)
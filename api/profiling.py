@@ -0,0 +1,92 @@
+"""
+On-demand sampling profiler producing flamegraph-compatible collapsed stacks.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+class StackSampler:
+    """Periodically record the Python stack of every other thread.
+
+    Each sample is folded into a ``root;...;leaf`` string prefixed with the
+    thread name, which keeps event-loop and threadpool (SQLite) work apart.
+    The output of :meth:`collapsed` can be fed straight to ``flamegraph.pl``,
+    speedscope or inferno.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.elapsed = 0.0
+        self._started = 0.0
+        self._stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self._stacks.most_common()
+        )
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                self._stacks[self._fold(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    def _fold(self, thread_name: str, frame) -> str:
+        frames: List[str] = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({os.path.basename(code.co_filename)})"
+                self._labels[code] = label
+            frames.append(label)
+            frame = frame.f_back
+        frames.append(thread_name.replace(" ", "_"))
+        return ";".join(reversed(frames))
+
+
+_profile_lock = asyncio.Lock()
+
+
+def profile_in_progress() -> bool:
+    return _profile_lock.locked()
+
+
+async def sample_for(seconds: float, interval: float) -> StackSampler:
+    """Sample all threads for ``seconds`` while the event loop keeps serving."""
+    async with _profile_lock:
+        sampler = StackSampler(interval=interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        return sampler
@@ -0,0 +1,261 @@
+"""
+Token-bucket rate limiting applied before routing, validation or DB work.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def _take_token(
+    tokens: float, updated: float, now: float, rate: float, burst: float
+) -> Tuple[float, float]:
+    """Refill a bucket and try to spend one token.
+
+    Returns the new token count and the seconds to wait (0.0 when allowed).
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / rate
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets held in a bounded LRU map.
+
+    Each client refills at ``rate`` tokens per second up to ``burst``. At most
+    ``max_clients`` buckets are kept. When the map is full, the least recently
+    seen client is evicted, which at worst hands that client a fresh bucket.
+    """
+
+    blocking = False
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self.metrics: Dict[str, int] = {"allowed": 0, "rejected": 0, "failed_open": 0}
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str) -> float:
+        """Spend a token for ``client``; return seconds until retry (0.0 if allowed)."""
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[client] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+
+            bucket[0], retry_after = _take_token(
+                bucket[0], bucket[1], now, self.rate, self.burst
+            )
+            bucket[1] = now
+            self.metrics["rejected" if retry_after else "allowed"] += 1
+            return retry_after
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self.metrics.update(allowed=0, rejected=0, failed_open=0)
+
+
+class SharedTokenBucketLimiter(TokenBucketLimiter):
+    """Token buckets stored in a local SQLite file shared by worker processes.
+
+    Each acquire is one short ``BEGIN IMMEDIATE`` transaction on a primary-key
+    row. A bucket idle for ``burst / rate`` seconds is full again, so it is
+    equivalent to having no row. These stale rows are purged periodically,
+    which keeps the file bounded by the number of recently active clients.
+
+    Acquiring may wait up to ``busy_timeout`` seconds for another process's
+    write lock, so the middleware runs it in the threadpool rather than on the
+    event loop. If the file stays locked or cannot be written, the request is
+    let through and counted as ``failed_open`` instead of failing real traffic.
+    """
+
+    blocking = True
+    PURGE_EVERY = 256
+
+    def __init__(
+        self,
+        path: Path,
+        rate: float,
+        burst: float,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.time,
+        busy_timeout: float = 1.0,
+    ) -> None:
+        super().__init__(rate, burst, max_clients, clock)
+        self.path = Path(path)
+        self._connection = sqlite3.connect(
+            self.path,
+            timeout=busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                client TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._inserts = 0
+
+    def acquire(self, client: str) -> float:
+        with self._lock:
+            try:
+                retry_after = self._take(client, self.clock())
+            except sqlite3.OperationalError:
+                self.metrics["failed_open"] += 1
+                return 0.0
+
+            self.metrics["rejected" if retry_after else "allowed"] += 1
+            return retry_after
+
+    def reset(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM rate_limit_buckets")
+            self.metrics.update(allowed=0, rejected=0, failed_open=0)
+
+    def _take(self, client: str, now: float) -> float:
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM rate_limit_buckets WHERE client = ?",
+                (client,),
+            ).fetchone()
+            tokens, updated = row if row is not None else (self.burst, now)
+            tokens, retry_after = _take_token(tokens, updated, now, self.rate, self.burst)
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets VALUES (?, ?, ?)",
+                (client, tokens, now),
+            )
+            if row is None:
+                self._inserts += 1
+                if self._inserts % self.PURGE_EVERY == 0:
+                    self._purge(now)
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def _purge(self, now: float) -> None:
+        self._connection.execute(
+            "DELETE FROM rate_limit_buckets WHERE updated < ?",
+            (now - self.burst / self.rate,),
+        )
+        self._connection.execute(
+            """
+            DELETE FROM rate_limit_buckets WHERE client IN (
+                SELECT client FROM rate_limit_buckets
+                ORDER BY updated DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_clients,),
+        )
+
+
+def rate_limiter_from_env() -> Optional[TokenBucketLimiter]:
+    """Build the limiter from ``RATE_LIMIT_*`` variables; it is off unless a rate is set."""
+    rate = float(os.environ.get("RATE_LIMIT_PER_SECOND", "0"))
+    if rate <= 0:
+        return None
+    burst = float(os.environ.get("RATE_LIMIT_BURST", "20"))
+    max_clients = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+    state_path = os.environ.get("RATE_LIMIT_STATE_PATH")
+    if state_path:
+        return SharedTokenBucketLimiter(Path(state_path), rate, burst, max_clients)
+    return TokenBucketLimiter(rate, burst, max_clients)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware that answers 429 before the request reaches routing.
+
+    Clients are identified by the ``X-API-Key`` header when it is one of
+    ``api_keys``, otherwise by their IP address, so rotating made-up keys does
+    not earn fresh buckets. The first ``X-Forwarded-For`` entry is used only
+    when ``trust_forwarded_for`` is set, i.e. behind a proxy that overwrites it.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[TokenBucketLimiter],
+        paths: Iterable[str],
+        trust_forwarded_for: bool = False,
+        api_keys: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.paths = frozenset(paths)
+        self.trust_forwarded_for = trust_forwarded_for
+        self.api_keys = frozenset(key.encode("latin-1") for key in api_keys)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            self.limiter is None
+            or scope["type"] != "http"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client = self.client_key(scope)
+        if self.limiter.blocking:
+            retry_after = await run_in_threadpool(self.limiter.acquire, client)
+        else:
+            retry_after = self.limiter.acquire(client)
+        if retry_after:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    def client_key(self, scope: Scope) -> str:
+        forwarded_for = None
+        for name, value in scope["headers"]:
+            if name == b"x-api-key" and value in self.api_keys:
+                return "key:" + value.decode("latin-1")
+            if name == b"x-forwarded-for":
+                forwarded_for = value
+        if self.trust_forwarded_for and forwarded_for:
+            return "ip:" + forwarded_for.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
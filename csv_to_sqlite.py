@@ -4,15 +4,61 @@ Generated via GPT-5-Codex in Cursor.
 """
 
 import argparse
+import bisect
 import csv
+import math
 import re
 import re
 import sqlite3
+from collections import Counter, defaultdict, deque
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, List
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from models.county_data import ALLOWED_MEASURES, MEASURE_KEYS
 
-def convert_csv_to_sqlite(database_path: str, csv_path: str) -> dict:
+
+SOURCE_TABLE = "county_health_rankings"
+ZIP_TABLE = "zip_county"
+MEASURES_TABLE = "measures"
+COUNTIES_TABLE = "counties"
+ZIP_FIPS_TABLE = "zip_fips"
+FACTS_TABLE = "county_health_facts"
+TYPED_TABLE = "county_health_rankings_typed"
+STATISTICS_TABLE = "measure_statistics"
+
+PERCENTILES: Tuple[Tuple[str, float], ...] = (
+    ("p10", 0.10),
+    ("p25", 0.25),
+    ("p50", 0.50),
+    ("p75", 0.75),
+    ("p90", 0.90),
+)
+
+_DIGITS_ONLY = "{column} <> '' AND {column} NOT GLOB '*[^0-9]*'"
+
+VALIDATION_BATCH_SIZE = 50_000
+FRACTION_SUM_TOLERANCE = 0.01
+NUMERIC_COLUMNS: Tuple[str, ...] = (
+    "numerator",
+    "denominator",
+    "raw_value",
+    "confidence_interval_lower_bound",
+    "confidence_interval_upper_bound",
+    "zip_pop",
+    "zip_pop_in_county",
+)
+
+_ZIP_PATTERN = re.compile(r"\d{5}")
+_ALLOWED_MEASURE_SET = frozenset(ALLOWED_MEASURES)
+
+
+def convert_csv_to_sqlite(
+    database_path: str,
+    csv_path: str,
+    validate: bool = False,
+    quarantine: bool = False,
+) -> dict:
     csv_file = Path(csv_path)
     db_file = Path(database_path)
 
@@ -27,6 +73,19 @@ def convert_csv_to_sqlite(database_path: str, csv_path: str) -> dict:
         rows: List[Iterable[str]] = list(reader)
 
     table_name = _table_name_from_path(csv_file)
+    quarantine_table = f"{table_name}_quarantine"
+
+    report = None
+    quarantined: List[list] = []
+    if validate or quarantine:
+        rejected, report = validate_rows(header, rows)
+        if quarantine and rejected:
+            width = len(header)
+            quarantined = [
+                [*(list(rows[index]) + [""] * width)[:width], reason]
+                for index, reason in sorted(rejected.items())
+            ]
+            rows = [row for index, row in enumerate(rows) if index not in rejected]
 
     columns_definition = ", ".join(f'"{column}" TEXT' for column in header)
     insert_columns = ", ".join(f'"{column}"' for column in header)
@@ -35,6 +94,7 @@ def convert_csv_to_sqlite(database_path: str, csv_path: str) -> dict:
     with sqlite3.connect(db_file) as connection:
         cursor = connection.cursor()
         cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        cursor.execute(f'DROP TABLE IF EXISTS "{quarantine_table}"')
         cursor.execute(f'CREATE TABLE "{table_name}" ({columns_definition})')
 
         rows_inserted = 0
@@ -46,9 +106,510 @@ def convert_csv_to_sqlite(database_path: str, csv_path: str) -> dict:
             )
             rows_inserted = len(rows)
 
+        if quarantined:
+            cursor.execute(
+                f'CREATE TABLE "{quarantine_table}" '
+                f'({columns_definition}, "reason" TEXT)'
+            )
+            cursor.executemany(
+                f'INSERT INTO "{quarantine_table}" VALUES ({placeholders}, ?)',
+                quarantined,
+            )
+
         connection.commit()
 
-    return {"table_name": table_name, "rows_inserted": rows_inserted}
+    return {
+        "table_name": table_name,
+        "rows_inserted": rows_inserted,
+        "rows_quarantined": len(quarantined),
+        "validation": report,
+    }
+
+
+def validate_rows(
+    header: Sequence[str],
+    rows: Sequence[Sequence[str]],
+    batch_size: int = VALIDATION_BATCH_SIZE,
+) -> Tuple[Dict[int, str], dict]:
+    """Run column-wise data-quality checks over ``rows`` in batches.
+
+    Checks only apply to the columns present (matched case-insensitively): ZIP
+    format, numeric parseability, allowed measure names, duplicate ZIP/county
+    pairs and, per ZIP, whether ``zip_pop_in_county`` fractions sum to 1.
+    Returns the rejected row indexes mapped to their reasons, and a summary.
+    """
+    positions = {name.lower(): index for index, name in enumerate(header)}
+    width = len(header)
+
+    # (reason, column index, per-value predicate, whole-column fast check)
+    column_checks: List[
+        Tuple[str, int, Callable[[str], object], Callable[[Sequence[str]], bool]]
+    ] = []
+    if "zip" in positions:
+        column_checks.append(
+            ("invalid_zip", positions["zip"], _ZIP_PATTERN.fullmatch, _all_zips)
+        )
+    for name in NUMERIC_COLUMNS:
+        if name in positions:
+            column_checks.append(
+                (f"non_numeric_{name}", positions[name], _is_numeric_or_empty, _all_numeric)
+            )
+    if "measure_name" in positions:
+        column_checks.append(
+            (
+                "unknown_measure_name",
+                positions["measure_name"],
+                _ALLOWED_MEASURE_SET.__contains__,
+                _all_allowed_measures,
+            )
+        )
+
+    pair_columns = [
+        positions[name]
+        for name in ("zip", "county", "state_abbreviation")
+        if name in positions
+    ]
+    check_pairs = "zip" in positions and "county" in positions
+    check_fractions = "zip" in positions and "zip_pop_in_county" in positions
+
+    needed_columns = {index for _, index, _, _ in column_checks}
+    if check_pairs:
+        needed_columns.update(pair_columns)
+    if check_fractions:
+        needed_columns.add(positions["zip_pop_in_county"])
+
+    rejected: Dict[int, str] = {}
+    issues: Counter = Counter()
+    seen_pairs = set()
+    fraction_sums: Dict[str, float] = defaultdict(float)
+
+    def reject(index: int, reason: str) -> None:
+        issues[reason] += 1
+        rejected[index] = f"{rejected[index]}; {reason}" if index in rejected else reason
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+
+        if set(map(len, batch)) - {width}:
+            for offset, row in enumerate(batch):
+                if len(row) != width:
+                    reject(start + offset, "wrong_column_count")
+            batch = [(list(row) + [""] * width)[:width] for row in batch]
+
+        if not batch:
+            continue
+        columns = {index: list(map(itemgetter(index), batch)) for index in needed_columns}
+
+        # Each check runs as one C-level pass over the column; rows are only
+        # enumerated for a batch that actually contains failures.
+        for reason, index, predicate, column_ok in column_checks:
+            column = columns[index]
+            if column_ok(column):
+                continue
+            for offset, ok in enumerate(map(predicate, column)):
+                if not ok:
+                    reject(start + offset, reason)
+
+        if check_pairs:
+            # Joined strings rather than tuples: cheaper to hash, not GC-tracked.
+            keys = list(map("\x1f".join, zip(*(columns[index] for index in pair_columns))))
+            batch_keys = set(keys)
+            if len(batch_keys) == len(keys) and seen_pairs.isdisjoint(batch_keys):
+                seen_pairs |= batch_keys
+            else:
+                for offset, key in enumerate(keys):
+                    if key in seen_pairs:
+                        reject(start + offset, "duplicate_zip_county")
+                    else:
+                        seen_pairs.add(key)
+
+        if check_fractions:
+            zips = columns[positions["zip"]]
+            fractions = columns[positions["zip_pop_in_county"]]
+            try:
+                values = list(map(float, fractions))
+            except ValueError:
+                values = [
+                    float(fraction) if _is_numeric_or_empty(fraction) and fraction else 0.0
+                    for fraction in fractions
+                ]
+            for zip_code, value in zip(zips, values):
+                fraction_sums[zip_code] += value
+
+    # ZIPs without population report 0 for every county; only flag partial splits.
+    mismatched_zips = sorted(
+        zip_code
+        for zip_code, total in fraction_sums.items()
+        if total and abs(total - 1.0) > FRACTION_SUM_TOLERANCE
+    )
+
+    report = {
+        "rows_checked": len(rows),
+        "rows_rejected": len(rejected),
+        "issues": dict(issues),
+        "fraction_sum_mismatches": len(mismatched_zips),
+        "fraction_sum_mismatch_examples": mismatched_zips[:10],
+    }
+    return rejected, report
+
+
+def _is_numeric_or_empty(value: str) -> bool:
+    if not value:
+        return True
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _all_zips(column: Sequence[str]) -> bool:
+    # One join and two C-level scans instead of a regex match per value.
+    joined = "".join(column)
+    return set(map(len, column)) == {5} and joined.isascii() and joined.isdigit()
+
+
+def _all_numeric(column: Sequence[str]) -> bool:
+    try:
+        # Parse every non-empty value in C; the first failure falls back per row.
+        deque(map(float, filter(None, column)), maxlen=0)
+    except ValueError:
+        return False
+    return True
+
+
+def _all_allowed_measures(column: Sequence[str]) -> bool:
+    return _ALLOWED_MEASURE_SET.issuperset(column)
+
+
+def has_source_tables(database_path: str) -> bool:
+    """Return True when both TEXT tables the keyed build reads are loaded."""
+    return _has_tables(database_path, (ZIP_TABLE, SOURCE_TABLE))
+
+
+def has_typed_tables(database_path: str) -> bool:
+    """Return True when a previous ``--typed`` build left its tables behind."""
+    return _has_tables(database_path, (TYPED_TABLE, STATISTICS_TABLE))
+
+
+def _has_tables(database_path: str, names: Sequence[str]) -> bool:
+    placeholders = ", ".join("?" for _ in names)
+    with sqlite3.connect(database_path) as connection:
+        found = connection.execute(
+            f"SELECT COUNT(*) FROM sqlite_master "
+            f"WHERE type = 'table' AND name IN ({placeholders})",
+            tuple(names),
+        ).fetchone()[0]
+    return found == len(names)
+
+
+def build_keyed_tables(database_path: str) -> dict:
+    """Build integer-keyed serving tables from the ZIP and rankings TEXT tables.
+
+    ZIPs are stored as integers, counties by integer FIPS code and measures by
+    their position in ``ALLOWED_MEASURES``, so API lookups join on integers only.
+    The ZIP to county mapping is resolved once here using the same county/state
+    name match the API used to perform per request. Every spelling a FIPS code
+    appears under in the rankings is matched, not just the one kept in
+    ``counties``.
+
+    The typed tables are derived from the facts built here, so they are dropped
+    rather than left serving the previous load; rebuild them with
+    :func:`build_typed_tables`.
+    """
+    with sqlite3.connect(database_path) as connection:
+        cursor = connection.cursor()
+        for table in (
+            STATISTICS_TABLE,
+            TYPED_TABLE,
+            FACTS_TABLE,
+            ZIP_FIPS_TABLE,
+            COUNTIES_TABLE,
+            MEASURES_TABLE,
+        ):
+            cursor.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+        cursor.execute(
+            f"""
+            CREATE TABLE "{MEASURES_TABLE}" (
+                measure_key INTEGER PRIMARY KEY,
+                measure_name TEXT NOT NULL UNIQUE
+            )
+            """
+        )
+        cursor.executemany(
+            f'INSERT INTO "{MEASURES_TABLE}" VALUES (?, ?)',
+            [(key, name) for name, key in MEASURE_KEYS.items()],
+        )
+
+        cursor.execute(
+            f"""
+            CREATE TABLE "{COUNTIES_TABLE}" (
+                fips INTEGER PRIMARY KEY,
+                fipscode TEXT NOT NULL,
+                state TEXT,
+                county TEXT,
+                state_code TEXT,
+                county_code TEXT
+            )
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO "{COUNTIES_TABLE}"
+            SELECT CAST(fipscode AS INTEGER), fipscode, State, County, State_code, County_code
+            FROM "{SOURCE_TABLE}"
+            WHERE {_DIGITS_ONLY.format(column="fipscode")}
+            GROUP BY CAST(fipscode AS INTEGER)
+            """
+        )
+
+        cursor.execute(
+            f"""
+            CREATE TABLE "{ZIP_FIPS_TABLE}" (
+                zip INTEGER NOT NULL,
+                fips INTEGER NOT NULL,
+                PRIMARY KEY (zip, fips)
+            ) WITHOUT ROWID
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT OR IGNORE INTO "{ZIP_FIPS_TABLE}"
+            SELECT CAST(zc.zip AS INTEGER), CAST(chr.fipscode AS INTEGER)
+            FROM "{ZIP_TABLE}" zc
+            JOIN (
+                SELECT DISTINCT fipscode, State, County
+                FROM "{SOURCE_TABLE}"
+                WHERE {_DIGITS_ONLY.format(column="fipscode")}
+            ) chr
+                ON chr.County = zc.county AND chr.State = zc.state_abbreviation
+            WHERE {_DIGITS_ONLY.format(column="zc.zip")}
+            """
+        )
+
+        cursor.execute(
+            f"""
+            CREATE TABLE "{FACTS_TABLE}" (
+                fips INTEGER NOT NULL,
+                measure_key INTEGER NOT NULL,
+                year_span TEXT,
+                measure_id TEXT,
+                numerator TEXT,
+                denominator TEXT,
+                raw_value TEXT,
+                confidence_interval_lower_bound TEXT,
+                confidence_interval_upper_bound TEXT,
+                data_release_year TEXT
+            )
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO "{FACTS_TABLE}"
+            SELECT
+                CAST(chr.fipscode AS INTEGER),
+                m.measure_key,
+                chr.Year_span,
+                chr.Measure_id,
+                chr.Numerator,
+                chr.Denominator,
+                chr.Raw_value,
+                chr.Confidence_Interval_Lower_Bound,
+                chr.Confidence_Interval_Upper_Bound,
+                chr.Data_Release_Year
+            FROM "{SOURCE_TABLE}" chr
+            JOIN "{MEASURES_TABLE}" m ON m.measure_name = chr.Measure_name
+            WHERE {_DIGITS_ONLY.format(column="chr.fipscode")}
+            ORDER BY 1, 2, 3
+            """
+        )
+        facts_inserted = cursor.rowcount
+        cursor.execute(
+            f'CREATE INDEX "{FACTS_TABLE}_lookup" '
+            f'ON "{FACTS_TABLE}" (fips, measure_key, year_span)'
+        )
+
+        zip_links = connection.execute(
+            f'SELECT COUNT(*) FROM "{ZIP_FIPS_TABLE}"'
+        ).fetchone()[0]
+
+        connection.commit()
+
+    return {"facts_inserted": facts_inserted, "zip_links": zip_links}
+
+
+def build_typed_tables(database_path: str) -> dict:
+    """Build numeric copies of the keyed facts plus per-measure/year statistics.
+
+    Reads ``county_health_facts`` (see ``build_keyed_tables``) once, parses the
+    numeric columns into REAL/INTEGER values, and in the same pass groups raw
+    values by ``(measure_key, year_span)`` to compute min, max, mean,
+    percentiles and a county rank (1 = lowest raw value). Statistics and ranks
+    only count each county's latest release and skip state/national rows, whose
+    ``county_rank`` stays NULL.
+    """
+    with sqlite3.connect(database_path) as connection:
+        source_rows = connection.execute(
+            f"""
+            SELECT
+                fips, measure_key, year_span, measure_id, numerator, denominator,
+                raw_value, confidence_interval_lower_bound,
+                confidence_interval_upper_bound, data_release_year
+            FROM "{FACTS_TABLE}"
+            """
+        ).fetchall()
+
+        typed_rows: List[list] = []
+        # Latest release per county/measure/year; only these feed the statistics.
+        latest: Dict[Tuple[int, int, str], list] = {}
+
+        for row in source_rows:
+            (fips, measure_key, year_span, measure_id, numerator, denominator,
+             raw_value, lower, upper, release_year) = row
+            typed_row = [
+                fips,
+                measure_key,
+                year_span,
+                _to_int(measure_id),
+                _to_float(numerator),
+                _to_float(denominator),
+                _to_float(raw_value),
+                _to_float(lower),
+                _to_float(upper),
+                _to_int(release_year),
+                None,
+            ]
+            typed_rows.append(typed_row)
+
+            # FIPS codes ending in 000 are state or national aggregates, not counties.
+            if fips % 1000 == 0:
+                continue
+            key = (fips, measure_key, year_span)
+            current = latest.get(key)
+            if current is None or (typed_row[9] or 0) >= (current[9] or 0):
+                latest[key] = typed_row
+
+        ranked_rows = [typed_row for typed_row in latest.values() if typed_row[6] is not None]
+        groups: Dict[Tuple[int, str], List[float]] = defaultdict(list)
+        for typed_row in ranked_rows:
+            groups[(typed_row[1], typed_row[2])].append(typed_row[6])
+
+        statistics_rows = []
+        for key, values in groups.items():
+            values.sort()
+            statistics_rows.append(
+                (
+                    key[0],
+                    key[1],
+                    len(values),
+                    values[0],
+                    values[-1],
+                    math.fsum(values) / len(values),
+                    *(_percentile(values, fraction) for _, fraction in PERCENTILES),
+                )
+            )
+
+        for typed_row in ranked_rows:
+            values = groups[(typed_row[1], typed_row[2])]
+            # Competition ranking: ties share the lowest position.
+            typed_row[10] = bisect.bisect_left(values, typed_row[6]) + 1
+
+        percentile_columns = ", ".join(f"{name} REAL" for name, _ in PERCENTILES)
+
+        cursor = connection.cursor()
+        cursor.execute(f'DROP TABLE IF EXISTS "{TYPED_TABLE}"')
+        cursor.execute(
+            f"""
+            CREATE TABLE "{TYPED_TABLE}" (
+                fips INTEGER NOT NULL,
+                measure_key INTEGER NOT NULL,
+                year_span TEXT,
+                measure_id INTEGER,
+                numerator REAL,
+                denominator REAL,
+                raw_value REAL,
+                confidence_interval_lower_bound REAL,
+                confidence_interval_upper_bound REAL,
+                data_release_year INTEGER,
+                county_rank INTEGER
+            )
+            """
+        )
+        cursor.executemany(
+            f'INSERT INTO "{TYPED_TABLE}" VALUES ({", ".join("?" * 11)})',
+            typed_rows,
+        )
+        cursor.execute(
+            f'CREATE INDEX "{TYPED_TABLE}_lookup" '
+            f'ON "{TYPED_TABLE}" (fips, measure_key, year_span)'
+        )
+
+        cursor.execute(f'DROP TABLE IF EXISTS "{STATISTICS_TABLE}"')
+        cursor.execute(
+            f"""
+            CREATE TABLE "{STATISTICS_TABLE}" (
+                measure_key INTEGER NOT NULL,
+                year_span TEXT NOT NULL,
+                county_count INTEGER,
+                min REAL,
+                max REAL,
+                mean REAL,
+                {percentile_columns},
+                PRIMARY KEY (measure_key, year_span)
+            ) WITHOUT ROWID
+            """
+        )
+        cursor.executemany(
+            f'INSERT INTO "{STATISTICS_TABLE}" '
+            f'VALUES ({", ".join("?" * (6 + len(PERCENTILES)))})',
+            statistics_rows,
+        )
+
+        connection.commit()
+
+    return {
+        "typed_table": TYPED_TABLE,
+        "statistics_table": STATISTICS_TABLE,
+        "rows_inserted": len(typed_rows),
+        "statistics_rows": len(statistics_rows),
+    }
+
+
+def compact_database(database_path: str) -> None:
+    """Drop the TEXT source tables once the keyed tables exist, then VACUUM."""
+    with sqlite3.connect(database_path) as connection:
+        for table in (SOURCE_TABLE, ZIP_TABLE):
+            connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        connection.commit()
+        connection.execute("VACUUM")
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    number = _to_float(value)
+    if number is None or not number.is_integer():
+        return None
+    return int(number)
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
 
 
 def _table_name_from_path(csv_file: Path) -> str:
@@ -63,16 +624,99 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("database", help="Path to the output SQLite database file")
     parser.add_argument("csv", help="Path to the source CSV file")
-    return parser.parse_args()
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Run data-quality checks on the rows before loading them",
+    )
+    parser.add_argument(
+        "--quarantine",
+        action="store_true",
+        help=(
+            "Move rows failing validation into '<table>_quarantine' instead of "
+            "loading them (implies --validate)"
+        ),
+    )
+    parser.add_argument(
+        "--no-keyed",
+        action="store_true",
+        help=(
+            f"Do not build the integer-keyed serving tables, which are otherwise "
+            f"rebuilt whenever both '{ZIP_TABLE}' and '{SOURCE_TABLE}' are loaded"
+        ),
+    )
+    parser.add_argument(
+        "--typed",
+        action="store_true",
+        help=(
+            f"Also build the numeric '{TYPED_TABLE}' and '{STATISTICS_TABLE}' "
+            f"tables (rebuilt automatically once they exist)"
+        ),
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Drop the TEXT source tables after building keyed tables and VACUUM",
+    )
+    args = parser.parse_args()
+    if args.no_keyed and (args.typed or args.compact):
+        parser.error("--typed and --compact rebuild the keyed tables; drop --no-keyed")
+    return args
 
 
 def main() -> None:
     args = parse_args()
-    result = convert_csv_to_sqlite(args.database, args.csv)
+    result = convert_csv_to_sqlite(
+        args.database,
+        args.csv,
+        validate=args.validate,
+        quarantine=args.quarantine,
+    )
     print(
         f"Loaded {result['rows_inserted']} rows into table '{result['table_name']}'"
     )
 
+    report = result["validation"]
+    if report is not None:
+        print(
+            f"Validation: {report['rows_rejected']} of {report['rows_checked']} rows "
+            f"failed checks, {result['rows_quarantined']} quarantined"
+        )
+        for issue, count in sorted(report["issues"].items()):
+            print(f"  {issue}: {count}")
+        if report["fraction_sum_mismatches"]:
+            examples = ", ".join(report["fraction_sum_mismatch_examples"])
+            print(
+                f"  ZIPs whose zip_pop_in_county does not sum to 1: "
+                f"{report['fraction_sum_mismatches']} (e.g. {examples})"
+            )
+
+    # --typed and --compact need fresh keyed tables, so a missing source table
+    # is an error for them rather than a reason to skip the build.
+    if not args.no_keyed and (
+        args.typed or args.compact or has_source_tables(args.database)
+    ):
+        # The keyed build drops the typed tables; keep /v2 in step with the
+        # new facts if an earlier run built them.
+        typed_existed = has_typed_tables(args.database)
+        keyed = build_keyed_tables(args.database)
+        print(
+            f"Built {keyed['facts_inserted']} keyed facts and "
+            f"{keyed['zip_links']} ZIP/county links"
+        )
+        args.typed = args.typed or typed_existed
+
+    if args.typed:
+        typed = build_typed_tables(args.database)
+        print(
+            f"Built {typed['rows_inserted']} typed rows in '{typed['typed_table']}' "
+            f"and {typed['statistics_rows']} rows in '{typed['statistics_table']}'"
+        )
+
+    if args.compact:
+        compact_database(args.database)
+        print("Dropped source tables and vacuumed the database")
+
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,6 @@
 """Pydantic models for the /county_data endpoint."""
 
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field, model_validator, validator
 
@@ -20,6 +20,20 @@ ALLOWED_MEASURES: Tuple[str, ...] = (
     "Daily fine particulate matter",
 )
 
+# Integer surrogate keys used by the storage layer (see csv_to_sqlite.py).
+MEASURE_KEYS: Dict[str, int] = {
+    name: key for key, name in enumerate(ALLOWED_MEASURES, start=1)
+}
+
+
+def _validate_zip(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return value
+    # isdigit() alone also accepts non-ASCII digits such as "٠٢١٣٨" or "²".
+    if len(value) != 5 or not (value.isascii() and value.isdigit()):
+        raise ValueError("ZIP must be a 5-digit string")
+    return value
+
 
 class CountyDataRequest(BaseModel):
     zip: Optional[str] = Field(None, description="5-digit ZIP code")
@@ -28,11 +42,7 @@ class CountyDataRequest(BaseModel):
 
     @validator("zip")
     def validate_zip(cls, value: Optional[str]) -> Optional[str]:
-        if value is None:
-            return value
-        if len(value) != 5 or not value.isdigit():
-            raise ValueError("ZIP must be a 5-digit string")
-        return value
+        return _validate_zip(value)
 
     @validator("measure_name")
     def validate_measure_name(cls, value: Optional[str]) -> Optional[str]:
@@ -74,3 +84,69 @@ class CountyHealthRecord(BaseModel):
 
 CountyDataResponse = List[CountyHealthRecord]
 
+
+class MeasureStatistics(BaseModel):
+    county_count: int
+    min: float
+    max: float
+    mean: float
+    p10: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+
+
+class TypedCountyHealthRecord(BaseModel):
+    state: str
+    county: str
+    state_code: str
+    county_code: str
+    year_span: str
+    measure_name: str
+    measure_id: Optional[int]
+    numerator: Optional[float]
+    denominator: Optional[float]
+    raw_value: Optional[float]
+    confidence_interval_lower_bound: Optional[float]
+    confidence_interval_upper_bound: Optional[float]
+    data_release_year: Optional[int]
+    fipscode: str
+    county_rank: Optional[int] = Field(
+        None, description="Rank of raw_value among counties for the measure/year (1 = lowest)"
+    )
+    statistics: Optional[MeasureStatistics] = None
+
+
+TypedCountyDataResponse = List[TypedCountyHealthRecord]
+
+
+class CountyProfileRequest(BaseModel):
+    zip: Optional[str] = Field(None, description="5-digit ZIP code")
+
+    @validator("zip")
+    def validate_zip(cls, value: Optional[str]) -> Optional[str]:
+        return _validate_zip(value)
+
+    @model_validator(mode="after")
+    def ensure_required_fields(cls, values: "CountyProfileRequest") -> "CountyProfileRequest":
+        if not values.zip:
+            raise ValueError("Missing required field: zip")
+        return values
+
+
+class CountyProfile(BaseModel):
+    state: str
+    county: str
+    state_code: str
+    county_code: str
+    fipscode: str
+    measures: Dict[str, List[Optional[float]]] = Field(
+        ..., description="raw_value per measure, aligned with CountyProfileResponse.years"
+    )
+
+
+class CountyProfileResponse(BaseModel):
+    zip: str
+    years: List[str]
+    counties: List[CountyProfile]
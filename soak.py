@@ -0,0 +1,430 @@
+"""
+Soak-test the API in-process and fail on memory or latency drift.
+"""
+
+import argparse
+import gc
+import json
+import random
+import resource
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.index import app, get_database_path
+from api.rate_limit import RateLimitMiddleware
+from csv_to_sqlite import build_keyed_tables, build_typed_tables, convert_csv_to_sqlite
+from models.county_data import ALLOWED_MEASURES
+
+
+FIXTURE_ZIP_CSV = (
+    "zip,default_state,county,county_state,state_abbreviation,county_code,"
+    "zip_pop,zip_pop_in_county,n_counties,default_city\n"
+    "02138,MA,Middlesex County,Massachusetts,MA,25017,1000,1,1,Cambridge\n"
+    "02139,MA,Middlesex County,Massachusetts,MA,25017,1000,1,1,Cambridge\n"
+    "02184,MA,Norfolk County,Massachusetts,MA,25021,500,1,1,Braintree\n"
+)
+
+FIXTURE_RANKINGS_HEADER = (
+    "State,County,State_code,County_code,Year_span,Measure_name,Measure_id,"
+    "Numerator,Denominator,Raw_value,Confidence_Interval_Lower_Bound,"
+    "Confidence_Interval_Upper_Bound,Data_Release_Year,fipscode\n"
+)
+
+FUZZ_ALPHABET = string.printable + "'\";%\\\x00\u00e9\u4e2d\U0001f600"
+
+
+def build_fixture_database(directory: Path) -> Path:
+    """Create a small keyed/typed database covering every allowed measure."""
+    zip_csv = directory / "zip_county.csv"
+    zip_csv.write_text(FIXTURE_ZIP_CSV, encoding="utf-8")
+
+    lines = [FIXTURE_RANKINGS_HEADER]
+    for county, county_code in (("Middlesex County", "17"), ("Norfolk County", "21")):
+        for measure_id, measure in enumerate(ALLOWED_MEASURES, start=1):
+            for year in range(2004, 2016):
+                raw = (measure_id * year) % 97 / 100
+                lines.append(
+                    f"MA,{county},25,{county_code},{year},{measure},{measure_id},"
+                    f"{raw * 1000:.0f},1000,{raw},{raw * 0.9:.3f},{raw * 1.1:.3f},"
+                    f"{year + 3},250{county_code}\n"
+                )
+    rankings_csv = directory / "county_health_rankings.csv"
+    rankings_csv.write_text("".join(lines), encoding="utf-8")
+
+    db_path = directory / "data.db"
+    convert_csv_to_sqlite(str(db_path), str(zip_csv))
+    convert_csv_to_sqlite(str(db_path), str(rankings_csv))
+    build_keyed_tables(str(db_path))
+    build_typed_tables(str(db_path))
+    return db_path
+
+
+def load_known_zips(db_path: Path, limit: int = 500) -> List[str]:
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT DISTINCT zip FROM zip_fips LIMIT ?", (limit,)
+        ).fetchall()
+    return [f"{row[0]:05d}" for row in rows]
+
+
+def random_text(rng: random.Random, max_length: int = 40) -> str:
+    return "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def random_json_value(rng: random.Random, depth: int = 0) -> object:
+    """Any JSON value: scalars of every type, nested lists and objects."""
+    kind = rng.randrange(8 if depth < 2 else 6)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rng.random() < 0.5
+    if kind == 2:
+        return rng.randint(-(10**12), 10**12)
+    if kind == 3:
+        return rng.uniform(-1e6, 1e6)
+    if kind == 4:
+        return random_text(rng)
+    if kind == 5:
+        return "".join(rng.choice(string.digits) for _ in range(rng.randint(0, 7)))
+    if kind == 6:
+        return [random_json_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {
+        random_text(rng, 8): random_json_value(rng, depth + 1)
+        for _ in range(rng.randint(0, 4))
+    }
+
+
+def fuzz_body(rng: random.Random, valid: dict) -> bytes:
+    """Mutate a valid request body into a randomized, usually invalid one.
+
+    Mutations swap a field for an arbitrary JSON value (non-string ``zip``
+    included), drop a field, add a junk key, replace the whole body with any
+    JSON value (lists, strings, numbers, ``null``), truncate the encoded JSON
+    or send random bytes.
+    """
+    body: object = dict(valid)
+    mutation = rng.randrange(6)
+    if mutation == 0:
+        body[rng.choice(list(valid))] = random_json_value(rng)
+    elif mutation == 1:
+        del body[rng.choice(list(valid))]
+    elif mutation == 2:
+        body[random_text(rng, 12)] = random_json_value(rng)
+    elif mutation == 3:
+        body = random_json_value(rng)
+
+    encoded = json.dumps(body).encode("utf-8")
+    if mutation == 4:
+        return encoded[: rng.randrange(len(encoded))]
+    if mutation == 5:
+        return bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 64)))
+    return encoded
+
+
+Sender = Callable[[TestClient, random.Random], object]
+
+
+def traffic_mix(zips: List[str]) -> List[Tuple[float, Sender]]:
+    """Weighted request generators: valid lookups on every endpoint plus fuzzing."""
+
+    def lookup_body(rng: random.Random) -> dict:
+        return {"zip": rng.choice(zips), "measure_name": rng.choice(ALLOWED_MEASURES)}
+
+    def profile_body(rng: random.Random) -> dict:
+        return {"zip": rng.choice(zips)}
+
+    def valid(path: str, make_body: Callable[[random.Random], dict]) -> Sender:
+        return lambda client, rng: client.post(path, json=make_body(rng))
+
+    def fuzzed(path: str, make_body: Callable[[random.Random], dict]) -> Sender:
+        return lambda client, rng: client.post(
+            path,
+            content=fuzz_body(rng, make_body(rng)),
+            headers={"Content-Type": "application/json"},
+        )
+
+    def unknown_zip(make_body: Callable[[random.Random], dict]):
+        return lambda rng: {**make_body(rng), "zip": "99999"}
+
+    def teapot(client: TestClient, rng: random.Random):
+        body = lookup_body(rng) if rng.random() < 0.5 else {}
+        return client.post("/county_data", json={**body, "coffee": "teapot"})
+
+    return [
+        (30, valid("/county_data", lookup_body)),
+        (12, valid("/v2/county_data", lookup_body)),
+        (12, valid("/county_profile", profile_body)),
+        (16, fuzzed("/county_data", lookup_body)),
+        (8, fuzzed("/v2/county_data", lookup_body)),
+        (8, fuzzed("/county_profile", profile_body)),
+        (6, valid("/county_data", unknown_zip(lookup_body))),
+        (4, valid("/county_profile", unknown_zip(profile_body))),
+        (4, teapot),
+    ]
+
+
+@contextmanager
+def without_rate_limiting(application: FastAPI) -> Iterator[FastAPI]:
+    """Serve ``application`` without its rate-limit middleware.
+
+    The soak drives one client far above any sane per-client budget. Taking the
+    middleware out, rather than resetting the limiter, leaves the live limiter's
+    metrics and any shared bucket file untouched.
+    """
+    middleware = application.user_middleware
+    application.user_middleware = [
+        entry for entry in middleware if entry.cls is not RateLimitMiddleware
+    ]
+    application.middleware_stack = None
+    try:
+        yield application
+    finally:
+        application.user_middleware = middleware
+        application.middleware_stack = None
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Peak rather than current RSS, but still monotonic evidence of growth.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def app_snapshot() -> tracemalloc.Snapshot:
+    """Snapshot excluding the harness's own bookkeeping and tracemalloc."""
+    return tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        )
+    )
+
+
+def traced_bytes(snapshot: tracemalloc.Snapshot) -> int:
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_soak(
+    duration: float,
+    db_path: Path,
+    warmup: float = 2.0,
+    sample_interval: float = 1.0,
+    max_traced_growth_mb: float = 2.0,
+    max_rss_growth_mb: float = 32.0,
+    max_latency_drift: float = 2.0,
+    latency_floor_ms: float = 5.0,
+    seed: int = 0,
+) -> dict:
+    """Drive mixed traffic for ``duration`` seconds and report drift.
+
+    Memory baselines are taken after ``warmup`` (and a full GC) so that import
+    and first-request caches are not counted as growth. Latency drift compares
+    the p95 of the first and last thirds of post-warmup requests and is only
+    flagged when it also exceeds ``latency_floor_ms`` in absolute terms. Traffic
+    bypasses the rate-limit middleware, and any 5xx response fails the run.
+    """
+    rng = random.Random(seed)
+    zips = load_known_zips(db_path)
+    mix = traffic_mix(zips)
+    weights = [weight for weight, _ in mix]
+    senders = [sender for _, sender in mix]
+
+    status_counts: Dict[int, int] = {}
+    latencies: List[float] = []
+    samples: List[dict] = []
+    baseline: Optional[dict] = None
+    baseline_snapshot = None
+
+    app.dependency_overrides[get_database_path] = lambda: db_path
+    tracemalloc.start(25)
+    try:
+        # Fuzzed input must never produce a 5xx; count those instead of raising.
+        with without_rate_limiting(app), TestClient(
+            app, raise_server_exceptions=False
+        ) as client:
+            start = time.perf_counter()
+            next_sample = start + sample_interval
+            while True:
+                now = time.perf_counter()
+                elapsed = now - start
+                if elapsed >= duration:
+                    break
+
+                if baseline is None and elapsed >= warmup:
+                    gc.collect()
+                    baseline_snapshot = app_snapshot()
+                    baseline = {
+                        "traced": traced_bytes(baseline_snapshot),
+                        "rss": current_rss_bytes(),
+                        "request_index": len(latencies),
+                    }
+
+                sender = rng.choices(senders, weights)[0]
+                request_start = time.perf_counter()
+                response = sender(client, rng)
+                latencies.append(time.perf_counter() - request_start)
+                status_counts[response.status_code] = (
+                    status_counts.get(response.status_code, 0) + 1
+                )
+
+                if now >= next_sample:
+                    next_sample += sample_interval
+                    samples.append(
+                        {
+                            "elapsed": round(elapsed, 3),
+                            "requests": len(latencies),
+                            "traced_bytes": tracemalloc.get_traced_memory()[0],
+                            "rss_bytes": current_rss_bytes(),
+                        }
+                    )
+
+        gc.collect()
+        final_snapshot = app_snapshot()
+        final_traced = traced_bytes(final_snapshot)
+        final_rss = current_rss_bytes()
+    finally:
+        tracemalloc.stop()
+        app.dependency_overrides.pop(get_database_path, None)
+
+    if baseline is None:
+        raise ValueError("duration must be longer than warmup")
+
+    measured = latencies[baseline["request_index"] :]
+    third = max(1, len(measured) // 3)
+    first_p95 = percentile(measured[:third], 0.95)
+    last_p95 = percentile(measured[-third:], 0.95)
+
+    traced_growth_mb = (final_traced - baseline["traced"]) / 2**20
+    rss_growth_mb = (final_rss - baseline["rss"]) / 2**20
+    latency_ratio = last_p95 / first_p95 if first_p95 else 1.0
+
+    failures = []
+    server_errors = sum(
+        count for status_code, count in status_counts.items() if status_code >= 500
+    )
+    if server_errors:
+        failures.append(f"{server_errors} requests failed with a server error")
+    if traced_growth_mb > max_traced_growth_mb:
+        failures.append(
+            f"traced memory grew {traced_growth_mb:.2f} MB (limit {max_traced_growth_mb} MB)"
+        )
+    if rss_growth_mb > max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth_mb:.2f} MB (limit {max_rss_growth_mb} MB)")
+    if (
+        latency_ratio > max_latency_drift
+        and (last_p95 - first_p95) * 1000 > latency_floor_ms
+    ):
+        failures.append(
+            f"p95 latency drifted {first_p95 * 1000:.2f} ms -> {last_p95 * 1000:.2f} ms "
+            f"(limit x{max_latency_drift})"
+        )
+
+    top_growth = [
+        str(stat)
+        for stat in final_snapshot.compare_to(baseline_snapshot, "lineno")[:10]
+        if stat.size_diff > 0
+    ]
+
+    return {
+        "passed": not failures,
+        "failures": failures,
+        "requests": len(latencies),
+        "status_counts": dict(sorted(status_counts.items())),
+        "traced_growth_mb": round(traced_growth_mb, 3),
+        "rss_growth_mb": round(rss_growth_mb, 3),
+        "p95_first_ms": round(first_p95 * 1000, 3),
+        "p95_last_ms": round(last_p95 * 1000, 3),
+        "p50_ms": round(percentile(measured, 0.5) * 1000, 3),
+        "samples": samples,
+        "top_allocation_growth": top_growth,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Soak-test the API and fail on memory or latency drift"
+    )
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic")
+    parser.add_argument(
+        "--database",
+        help="SQLite database with keyed/typed tables (default: a generated fixture)",
+    )
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds before baselining")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=2.0)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=32.0)
+    parser.add_argument(
+        "--max-latency-drift",
+        type=float,
+        default=2.0,
+        help="Allowed ratio between last-third and first-third p95 latency",
+    )
+    parser.add_argument("--latency-floor-ms", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    options = {
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "sample_interval": args.sample_interval,
+        "max_traced_growth_mb": args.max_traced_growth_mb,
+        "max_rss_growth_mb": args.max_rss_growth_mb,
+        "max_latency_drift": args.max_latency_drift,
+        "latency_floor_ms": args.latency_floor_ms,
+        "seed": args.seed,
+    }
+
+    if args.database:
+        report = run_soak(db_path=Path(args.database), **options)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report = run_soak(db_path=build_fixture_database(Path(tmpdir)), **options)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Sent {report['requests']} requests: {report['status_counts']}")
+        print(
+            f"Traced memory growth {report['traced_growth_mb']} MB, "
+            f"RSS growth {report['rss_growth_mb']} MB"
+        )
+        print(
+            f"p50 {report['p50_ms']} ms, p95 {report['p95_first_ms']} ms -> "
+            f"{report['p95_last_ms']} ms"
+        )
+        for failure in report["failures"]:
+            print(f"FAIL: {failure}")
+        if not report["passed"]:
+            print("Largest allocation growth since baseline:")
+            for line in report["top_allocation_growth"]:
+                print(f"  {line}")
+
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,25 @@ Exhaustive tests for the /county_data endpoint.
 Generated via GPT-5-Codex in Cursor.
 """
 
+import asyncio
 import sqlite3
 import tempfile
+import threading
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from fastapi.testclient import TestClient
 
+from backend.api import main
 from backend.api.main import app, get_database_path
-from backend.models.county_data import ALLOWED_MEASURES
+from backend.api.rate_limit import (
+    RateLimitMiddleware,
+    SharedTokenBucketLimiter,
+    TokenBucketLimiter,
+)
+from backend.models.county_data import ALLOWED_MEASURES, CountyDataRequest
+from csv_to_sqlite import build_keyed_tables, build_typed_tables
 
 
 def create_test_database(db_path: Path) -> None:
@@ -225,8 +235,14 @@ def create_test_database(db_path: Path) -> None:
     conn.commit()
     conn.close()
 
+    build_keyed_tables(str(db_path))
+
+
+class EndpointTestCase(unittest.TestCase):
+    """Serve a fresh temporary database and POST JSON bodies to ``path``."""
+
+    path = "/county_data"
 
-class TestCountyDataEndpoint(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.TemporaryDirectory()
         self.db_path = Path(self.temp_dir.name) / "data.db"
@@ -239,9 +255,11 @@ class TestCountyDataEndpoint(unittest.TestCase):
         app.dependency_overrides.clear()
         self.temp_dir.cleanup()
 
-    def post(self, payload: dict):
-        return self.client.post("/county_data", json=payload)
+    def post(self, payload: dict, headers=None):
+        return self.client.post(self.path, json=payload, headers=headers)
 
+
+class TestCountyDataEndpoint(EndpointTestCase):
     def test_successful_query_returns_expected_results(self):
         response = self.post({"zip": "02138", "measure_name": "Adult obesity"})
 
@@ -414,6 +432,17 @@ class TestCountyDataEndpoint(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json()["detail"], "ZIP must be a 5-digit string")
 
+    def test_non_object_json_returns_bad_request(self):
+        for payload in (b'["02138"]', b'"02138"', b"2138", b"null"):
+            response = self.client.post(
+                "/county_data",
+                content=payload,
+                headers={"Content-Type": "application/json"},
+            )
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["detail"], "Request body must be a JSON object")
+
     def test_invalid_measure_name_returns_bad_request(self):
         response = self.post({"zip": "02138", "measure_name": "Invalid Measure"})
 
@@ -444,6 +473,19 @@ class TestCountyDataEndpoint(unittest.TestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    def test_non_ascii_digit_zip_rejected(self):
+        arabic_indic = "\u0660\u0662\u0661\u0663\u0668"
+        fullwidth = "\uff10\uff12\uff11\uff13\uff18"
+        for zip_code in (arabic_indic, fullwidth, "0213\u00b2"):
+            for path, payload in (
+                ("/county_data", {"zip": zip_code, "measure_name": "Adult obesity"}),
+                ("/county_profile", {"zip": zip_code}),
+            ):
+                response = self.client.post(path, json=payload)
+
+                self.assertEqual(response.status_code, 400, (path, zip_code))
+                self.assertEqual(response.json()["detail"], "ZIP must be a 5-digit string")
+
     def test_sql_injection_attempt_rejected(self):
         malicious_zip = "02138' OR '1'='1"
         response = self.post({"zip": malicious_zip, "measure_name": "Adult obesity"})
@@ -464,6 +506,271 @@ class TestCountyDataEndpoint(unittest.TestCase):
             response = self.post({"zip": "02138", "measure_name": measure})
             self.assertIn(response.status_code, {200, 404})
 
+    @mock.patch.object(main, "rate_limiter", None)
+    def test_metrics_report_coalescing_counters(self):
+        before = self.client.get("/metrics").json()["coalescing"]
+
+        self.post({"zip": "02138", "measure_name": "Adult obesity"})
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        after = response.json()["coalescing"]
+        self.assertEqual(set(after), {"requests", "executions", "coalesced"})
+        self.assertEqual(after["requests"], before["requests"] + 1)
+        self.assertEqual(after["executions"], before["executions"] + 1)
+        self.assertEqual(after["coalesced"], before["coalesced"])
+        self.assertIsNone(response.json()["rate_limit"])
+
+
+class TestRateLimitedEndpoints(EndpointTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.limited_client(TokenBucketLimiter(rate=0.01, burst=3))
+
+    def limited_client(self, limiter):
+        patcher = mock.patch.object(main, "rate_limiter", limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return TestClient(
+            RateLimitMiddleware(
+                app, limiter, main.RATE_LIMITED_PATHS, api_keys=["known"]
+            )
+        )
+
+    def test_metrics_report_rate_limit_counters(self):
+        self.post({"zip": "02138", "measure_name": "Adult obesity"})
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.json()["rate_limit"], {"allowed": 1, "rejected": 0, "failed_open": 0})
+
+    def test_rate_limited_client_gets_429_before_validation(self):
+        for _ in range(3):
+            self.assertNotEqual(self.post({"zip": "bad"}).status_code, 429)
+
+        response = self.post({"zip": "bad"})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()["detail"], "Too many requests")
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+        self.assertEqual(self.client.get("/health").status_code, 200)
+        self.assertNotEqual(
+            self.post({"zip": "bad"}, headers={"X-API-Key": "known"}).status_code, 429
+        )
+
+    def test_rotating_unknown_api_keys_shares_the_ip_bucket(self):
+        statuses = [
+            self.post({"zip": "bad"}, headers={"X-API-Key": f"random-{i}"}).status_code
+            for i in range(5)
+        ]
+
+        self.assertEqual(statuses, [400, 400, 400, 429, 429])
+
+    def test_shared_limiter_rejects_over_budget_clients(self):
+        limiter = SharedTokenBucketLimiter(
+            Path(self.temp_dir.name) / "buckets.db", rate=0.01, burst=1
+        )
+        client = self.limited_client(limiter)
+
+        self.assertEqual(client.post("/county_profile", json={}).status_code, 400)
+        self.assertEqual(client.post("/county_profile", json={}).status_code, 429)
+        self.assertEqual(limiter.metrics, {"allowed": 1, "rejected": 1, "failed_open": 0})
+
+    def test_locked_shared_limiter_lets_requests_through(self):
+        path = Path(self.temp_dir.name) / "buckets.db"
+        limiter = SharedTokenBucketLimiter(path, rate=0.01, burst=1, busy_timeout=0.05)
+        client = self.limited_client(limiter)
+        holder = sqlite3.connect(path, isolation_level=None)
+        holder.execute("BEGIN IMMEDIATE")
+        try:
+            statuses = [
+                client.post("/county_profile", json={"zip": "02138"}).status_code
+                for _ in range(2)
+            ]
+        finally:
+            holder.execute("ROLLBACK")
+            holder.close()
+
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(
+            client.get("/metrics").json()["rate_limit"],
+            {"allowed": 0, "rejected": 0, "failed_open": 2},
+        )
+
+
+class TestCountyProfileEndpoint(EndpointTestCase):
+    path = "/county_profile"
+
+    def test_profile_pivots_every_measure_by_year(self):
+        response = self.post({"zip": "02138"})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["zip"], "02138")
+        self.assertEqual(
+            body["years"], ["2004", "2005", "2006", "2007", "2008", "2009", "2010"]
+        )
+        self.assertEqual(len(body["counties"]), 1)
+
+        county = body["counties"][0]
+        self.assertEqual(county["county"], "Middlesex County")
+        self.assertEqual(county["fipscode"], "25017")
+        self.assertEqual(list(county["measures"]), list(ALLOWED_MEASURES))
+        self.assertEqual(
+            county["measures"]["Adult obesity"],
+            [0.18, 0.2, 0.21, 0.22, 0.22, 0.23, 0.233],
+        )
+        self.assertEqual(
+            county["measures"]["Unemployment"],
+            [None, None, None, None, None, 0.5, None],
+        )
+        self.assertEqual(county["measures"]["Uninsured"], [None] * 7)
+
+    def test_profile_validation_and_not_found(self):
+        missing = self.post({})
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(missing.json()["detail"], "Missing required field: zip")
+
+        invalid = self.post({"zip": "02138' OR '1'='1"})
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(invalid.json()["detail"], "ZIP must be a 5-digit string")
+
+        not_found = self.post({"zip": "99999"})
+        self.assertEqual(not_found.status_code, 404)
+        self.assertEqual(not_found.json()["detail"], "No data found for provided zip")
+
+
+class TestTypedCountyDataEndpoint(EndpointTestCase):
+    path = "/v2/county_data"
+
+    def setUp(self):
+        super().setUp()
+        build_typed_tables(str(self.db_path))
+
+    def test_typed_query_returns_numbers_and_statistics(self):
+        response = self.post({"zip": "02138", "measure_name": "Adult obesity"})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(len(body), 7)
+
+        first = body[0]
+        self.assertEqual(first["year_span"], "2004")
+        self.assertEqual(first["measure_id"], 11)
+        self.assertEqual(first["numerator"], 35658.0)
+        self.assertEqual(first["raw_value"], 0.18)
+        self.assertIsNone(first["data_release_year"])
+        self.assertEqual(first["county_rank"], 1)
+        self.assertEqual(
+            first["statistics"],
+            {
+                "county_count": 1,
+                "min": 0.18,
+                "max": 0.18,
+                "mean": 0.18,
+                "p10": 0.18,
+                "p25": 0.18,
+                "p50": 0.18,
+                "p75": 0.18,
+                "p90": 0.18,
+            },
+        )
+        self.assertEqual(body[-1]["data_release_year"], 2014)
+
+    def test_typed_query_shares_request_validation(self):
+        self.assertEqual(self.post({"zip": "02138"}).status_code, 400)
+        self.assertEqual(self.post({"coffee": "teapot"}).status_code, 418)
+        self.assertEqual(
+            self.post({"zip": "99999", "measure_name": "Adult obesity"}).status_code,
+            404,
+        )
+
+
+class TestRequestCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "data.db"
+        create_test_database(self.db_path)
+
+        main.coalescing_metrics.update(requests=0, executions=0, coalesced=0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_concurrent_identical_lookups_share_one_query(self):
+        release = threading.Event()
+        original = main.query_county_data
+        calls = []
+
+        def slow_query(db_path, payload):
+            calls.append(payload.zip)
+            release.wait(timeout=5)
+            return original(db_path, payload)
+
+        async def run_lookups():
+            payload = CountyDataRequest(zip="02138", measure_name="Adult obesity")
+            tasks = [
+                asyncio.create_task(main.fetch_county_data(self.db_path, payload))
+                for _ in range(5)
+            ]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*tasks)
+
+        with mock.patch.object(main, "query_county_data", side_effect=slow_query):
+            results = asyncio.run(run_lookups())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertIsNotNone(results[0])
+        self.assertEqual(
+            main.coalescing_metrics,
+            {"requests": 5, "executions": 1, "coalesced": 4},
+        )
+
+    def test_follower_gets_result_when_leader_is_cancelled(self):
+        release = threading.Event()
+        original = main.query_county_data
+
+        def slow_query(db_path, payload):
+            release.wait(timeout=5)
+            return original(db_path, payload)
+
+        async def run_lookups():
+            payload = CountyDataRequest(zip="02138", measure_name="Adult obesity")
+            leader = asyncio.create_task(main.fetch_county_data(self.db_path, payload))
+            await asyncio.sleep(0.01)
+            follower = asyncio.create_task(main.fetch_county_data(self.db_path, payload))
+            await asyncio.sleep(0.01)
+
+            leader.cancel()
+            await asyncio.sleep(0.01)
+            release.set()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        with mock.patch.object(main, "query_county_data", side_effect=slow_query):
+            result = asyncio.run(run_lookups())
+
+        self.assertIsNotNone(result)
+        self.assertEqual(main.coalescing_metrics["executions"], 1)
+        self.assertEqual(main._in_flight, {})
+
+    def test_failed_lookup_is_not_cached(self):
+        payload = CountyDataRequest(zip="02138", measure_name="Adult obesity")
+
+        with mock.patch.object(
+            main, "query_county_data", side_effect=sqlite3.OperationalError("boom")
+        ):
+            with self.assertRaises(sqlite3.OperationalError):
+                asyncio.run(main.fetch_county_data(self.db_path, payload))
+
+        self.assertIsNotNone(asyncio.run(main.fetch_county_data(self.db_path, payload)))
+        self.assertEqual(main._in_flight, {})
+
 
 if __name__ == "__main__":
     unittest.main()
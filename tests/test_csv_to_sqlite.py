@@ -25,6 +25,7 @@ class TestCSVToSQLite(unittest.TestCase):
 
             self.assertEqual(result["table_name"], "source")
             self.assertEqual(result["rows_inserted"], 2)
+            self.assertIsNone(result["validation"])
             self.assertTrue(db_path.exists())
 
             with sqlite3.connect(db_path) as conn:
@@ -81,6 +82,284 @@ class TestCSVToSQLite(unittest.TestCase):
                 self.assertEqual(second_rows, [("3", "baz"), ("4", "qux")])
 
 
+    def test_validation_reports_bad_rows_and_fraction_sums(self):
+        from csv_to_sqlite import convert_csv_to_sqlite
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            csv_path = tmpdir_path / "zip_county.csv"
+            csv_path.write_text(
+                "zip,county,state_abbreviation,zip_pop,zip_pop_in_county\n"
+                "02138,Middlesex County,MA,100,1\n"
+                "02138,Middlesex County,MA,100,1\n"
+                "2184,Norfolk County,MA,50,1\n"
+                "02185,Norfolk County,MA,lots,0.4\n"
+                "02185,Suffolk County,MA,50,0.4\n"
+                "00501,Suffolk County,NY,,0\n",
+                encoding="utf-8",
+            )
+            db_path = tmpdir_path / "output.db"
+
+            result = convert_csv_to_sqlite(str(db_path), str(csv_path), validate=True)
+
+            self.assertEqual(result["rows_inserted"], 6)
+            self.assertEqual(result["rows_quarantined"], 0)
+            self.assertEqual(
+                result["validation"],
+                {
+                    "rows_checked": 6,
+                    "rows_rejected": 3,
+                    "issues": {
+                        "duplicate_zip_county": 1,
+                        "invalid_zip": 1,
+                        "non_numeric_zip_pop": 1,
+                    },
+                    "fraction_sum_mismatches": 2,
+                    "fraction_sum_mismatch_examples": ["02138", "02185"],
+                },
+            )
+
+    def test_quarantine_moves_rejected_rows_to_side_table(self):
+        from csv_to_sqlite import convert_csv_to_sqlite
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            csv_path = tmpdir_path / "rankings.csv"
+            csv_path.write_text(
+                "County,Measure_name,Raw_value\n"
+                "Middlesex County,Adult obesity,0.2\n"
+                "Middlesex County,Adult obesity,\n"
+                "Middlesex County,Adult obesity,n/a\n"
+                "Middlesex County,Unknown measure,0.5\n",
+                encoding="utf-8",
+            )
+            db_path = tmpdir_path / "output.db"
+
+            result = convert_csv_to_sqlite(str(db_path), str(csv_path), quarantine=True)
+
+            self.assertEqual(result["rows_inserted"], 2)
+            self.assertEqual(result["rows_quarantined"], 2)
+
+            with sqlite3.connect(db_path) as conn:
+                quarantined = conn.execute(
+                    "SELECT Measure_name, Raw_value, reason FROM rankings_quarantine"
+                ).fetchall()
+            self.assertEqual(
+                quarantined,
+                [
+                    ("Adult obesity", "n/a", "non_numeric_raw_value"),
+                    ("Unknown measure", "0.5", "unknown_measure_name"),
+                ],
+            )
+
+            result = convert_csv_to_sqlite(
+                str(db_path), str(csv_path), validate=False
+            )
+
+            self.assertEqual(result["rows_inserted"], 4)
+            self.assertIsNone(result["validation"])
+            with sqlite3.connect(db_path) as conn:
+                tables = {
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type='table'"
+                    ).fetchall()
+                }
+            self.assertEqual(tables, {"rankings"})
+
+    def write_rankings_csvs(self, tmpdir_path: Path) -> Path:
+        from csv_to_sqlite import convert_csv_to_sqlite
+
+        zip_csv = tmpdir_path / "zip_county.csv"
+        zip_csv.write_text(
+            "zip,default_state,county,county_state,state_abbreviation,county_code,"
+            "zip_pop,zip_pop_in_county,n_counties,default_city\n"
+            "02138,MA,Middlesex County,Massachusetts,MA,25017,100,1,1,Cambridge\n"
+            "02138,MA,Middlesex County,Massachusetts,MA,25017,100,1,1,Cambridge\n"
+            "02184,MA,Norfolk County,Massachusetts,MA,25021,50,0.5,2,Braintree\n"
+            "02184,MA,Suffolk County,Massachusetts,MA,25025,50,0.5,2,Braintree\n",
+            encoding="utf-8",
+        )
+        rankings_csv = tmpdir_path / "county_health_rankings.csv"
+        rankings_csv.write_text(
+            "State,County,State_code,County_code,Year_span,Measure_name,"
+            "Measure_id,Numerator,Denominator,Raw_value,"
+            "Confidence_Interval_Lower_Bound,Confidence_Interval_Upper_Bound,"
+            "Data_Release_Year,fipscode\n"
+            "MA,Suffolk Cnty,25,25,2009,Not a served measure,99,1,1,1,1,1,2012,25025\n"
+            "MA,Middlesex County,25,17,2009,Adult obesity,11,10,100,0.1,0.09,0.11,2012,25017\n"
+            "MA,Suffolk County,25,25,2009,Adult obesity,11,30,100,0.3,0.29,0.31,2012,25025\n"
+            "MA,Norfolk County,25,21,2009,Adult obesity,11,20,100,0.2,0.19,0.21,,25021\n"
+            "MA,Essex County,25,9,2009,Adult obesity,11,,,n/a,,,,25009\n"
+            "MA,Middlesex County,25,17,2009,Adult obesity,11,90,100,0.9,0.89,0.91,2011,25017\n"
+            "MA,Middlesex County,25,17,2009,Not a served measure,99,1,1,1,1,1,2012,25017\n"
+            "MA,Massachusetts,25,0,2009,Adult obesity,11,60,300,0.2,0.19,0.21,2012,25000\n"
+            "US,United States,00,000,2009,Adult obesity,11,600,3000,0.2,0.19,0.21,2012,00000\n",
+            encoding="utf-8",
+        )
+
+        db_path = tmpdir_path / "output.db"
+        convert_csv_to_sqlite(str(db_path), str(zip_csv))
+        convert_csv_to_sqlite(str(db_path), str(rankings_csv))
+        return db_path
+
+    def test_build_keyed_tables_stores_integer_keys(self):
+        from csv_to_sqlite import build_keyed_tables
+        from models.county_data import MEASURE_KEYS
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = self.write_rankings_csvs(Path(tmpdir))
+
+            result = build_keyed_tables(str(db_path))
+
+            self.assertEqual(result, {"facts_inserted": 7, "zip_links": 3})
+
+            with sqlite3.connect(db_path) as conn:
+                self.assertEqual(
+                    conn.execute("SELECT zip, fips FROM zip_fips ORDER BY zip, fips").fetchall(),
+                    [(2138, 25017), (2184, 25021), (2184, 25025)],
+                )
+                self.assertEqual(
+                    conn.execute(
+                        "SELECT DISTINCT typeof(fips), typeof(measure_key) "
+                        "FROM county_health_facts"
+                    ).fetchall(),
+                    [("integer", "integer")],
+                )
+                self.assertEqual(
+                    conn.execute(
+                        "SELECT DISTINCT measure_key FROM county_health_facts"
+                    ).fetchall(),
+                    [(MEASURE_KEYS["Adult obesity"],)],
+                )
+                self.assertEqual(
+                    conn.execute(
+                        "SELECT fipscode, state, county FROM counties WHERE fips = 25017"
+                    ).fetchone(),
+                    ("25017", "MA", "Middlesex County"),
+                )
+
+    def test_has_source_tables_requires_both_csvs(self):
+        from csv_to_sqlite import convert_csv_to_sqlite, has_source_tables
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            db_path = tmpdir_path / "output.db"
+            zip_csv = tmpdir_path / "zip_county.csv"
+            zip_csv.write_text("zip,county\n02138,Middlesex County\n", encoding="utf-8")
+
+            convert_csv_to_sqlite(str(db_path), str(zip_csv))
+            self.assertFalse(has_source_tables(str(db_path)))
+
+            self.write_rankings_csvs(tmpdir_path)
+            self.assertTrue(has_source_tables(str(db_path)))
+
+    def test_compact_database_drops_source_tables(self):
+        from csv_to_sqlite import build_keyed_tables, compact_database
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = self.write_rankings_csvs(Path(tmpdir))
+            build_keyed_tables(str(db_path))
+
+            compact_database(str(db_path))
+
+            with sqlite3.connect(db_path) as conn:
+                tables = {
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type='table'"
+                    ).fetchall()
+                }
+            self.assertEqual(
+                tables, {"measures", "counties", "zip_fips", "county_health_facts"}
+            )
+
+    def test_build_typed_tables_parses_numbers_and_computes_statistics(self):
+        from csv_to_sqlite import build_keyed_tables, build_typed_tables
+        from models.county_data import MEASURE_KEYS
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = self.write_rankings_csvs(Path(tmpdir))
+            build_keyed_tables(str(db_path))
+
+            result = build_typed_tables(str(db_path))
+
+            self.assertEqual(result["rows_inserted"], 7)
+            self.assertEqual(result["statistics_rows"], 1)
+
+            with sqlite3.connect(db_path) as conn:
+                rows = conn.execute(
+                    "SELECT fips, raw_value, numerator, data_release_year, county_rank "
+                    "FROM county_health_rankings_typed ORDER BY fips, data_release_year"
+                ).fetchall()
+                # Aggregates (FIPS xx000) and superseded releases are stored but not ranked.
+                self.assertEqual(
+                    rows,
+                    [
+                        (0, 0.2, 600.0, 2012, None),
+                        (25000, 0.2, 60.0, 2012, None),
+                        (25009, None, None, None, None),
+                        (25017, 0.9, 90.0, 2011, None),
+                        (25017, 0.1, 10.0, 2012, 1),
+                        (25021, 0.2, 20.0, None, 2),
+                        (25025, 0.3, 30.0, 2012, 3),
+                    ],
+                )
+
+                statistics = conn.execute(
+                    "SELECT county_count, min, max, mean, p25, p50, p75 "
+                    "FROM measure_statistics WHERE measure_key = ? AND year_span = '2009'",
+                    (MEASURE_KEYS["Adult obesity"],),
+                ).fetchone()
+                self.assertEqual(statistics[:3], (3, 0.1, 0.3))
+                self.assertAlmostEqual(statistics[3], 0.2)
+                self.assertAlmostEqual(statistics[4], 0.15)
+                self.assertAlmostEqual(statistics[5], 0.2)
+                self.assertAlmostEqual(statistics[6], 0.25)
+
+    def test_reloading_rankings_rebuilds_existing_typed_tables(self):
+        import contextlib
+        import io
+        from unittest import mock
+
+        from csv_to_sqlite import build_keyed_tables, has_typed_tables, main
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            db_path = self.write_rankings_csvs(tmpdir_path)
+            rankings_csv = tmpdir_path / "county_health_rankings.csv"
+
+            def run(*flags):
+                argv = ["csv_to_sqlite.py", str(db_path), str(rankings_csv), *flags]
+                with mock.patch("sys.argv", argv), contextlib.redirect_stdout(io.StringIO()):
+                    main()
+
+            run("--typed")
+            rankings_csv.write_text(
+                "State,County,State_code,County_code,Year_span,Measure_name,"
+                "Measure_id,Numerator,Denominator,Raw_value,"
+                "Confidence_Interval_Lower_Bound,Confidence_Interval_Upper_Bound,"
+                "Data_Release_Year,fipscode\n"
+                "MA,Suffolk County,25,25,2009,Adult obesity,11,40,100,0.4,0.39,0.41,2013,25025\n",
+                encoding="utf-8",
+            )
+            run()
+
+            with sqlite3.connect(db_path) as conn:
+                self.assertEqual(
+                    conn.execute(
+                        "SELECT fips, raw_value, county_rank FROM county_health_rankings_typed"
+                    ).fetchall(),
+                    [(25025, 0.4, 1)],
+                )
+                self.assertEqual(
+                    conn.execute("SELECT county_count, mean FROM measure_statistics").fetchall(),
+                    [(1, 0.4)],
+                )
+
+            build_keyed_tables(str(db_path))
+            self.assertFalse(has_typed_tables(str(db_path)))
+
 if __name__ == "__main__":
     unittest.main()
 
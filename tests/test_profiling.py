@@ -0,0 +1,97 @@
+"""
+Tests for the on-demand sampling profiler and its admin endpoint.
+"""
+
+import os
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from backend.api.main import app
+from backend.api.profiling import StackSampler
+
+
+COLLAPSED_LINE = re.compile(r"^\S.* \d+$")
+
+
+def busy_wait_for_sampler(stop: threading.Event) -> None:
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+class TestStackSampler(unittest.TestCase):
+    def test_collapsed_output_contains_other_thread_stacks(self):
+        stop = threading.Event()
+        worker = threading.Thread(
+            target=busy_wait_for_sampler, args=(stop,), name="worker thread"
+        )
+        worker.start()
+
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+        lines = sampler.collapsed().splitlines()
+        self.assertGreater(sampler.samples, 0)
+        self.assertTrue(all(COLLAPSED_LINE.match(line) for line in lines))
+        self.assertTrue(
+            any(
+                line.startswith("worker_thread;")
+                and "busy_wait_for_sampler (test_profiling.py)" in line
+                for line in lines
+            )
+        )
+        self.assertFalse(any("stack-sampler" in line for line in lines))
+
+
+class TestProfileEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_endpoint_hidden_without_admin_token(self):
+        with mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("ADMIN_TOKEN", None)
+            response = self.client.post("/admin/profile?seconds=0.1")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_wrong_token_is_forbidden(self):
+        with mock.patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+            response = self.client.post(
+                "/admin/profile?seconds=0.1", headers={"X-Admin-Token": "nope"}
+            )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_window_rejected(self):
+        with mock.patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+            response = self.client.post(
+                "/admin/profile?seconds=600", headers={"X-Admin-Token": "secret"}
+            )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_returns_collapsed_stacks(self):
+        with mock.patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+            response = self.client.post(
+                "/admin/profile?seconds=0.2&interval_ms=2",
+                headers={"X-Admin-Token": "secret"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertGreater(int(response.headers["X-Profile-Samples"]), 0)
+        lines = response.text.splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(COLLAPSED_LINE.match(line) for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Tests for the token-bucket rate limiter.
+"""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from backend.api.rate_limit import SharedTokenBucketLimiter, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_burst_then_reject_then_refill(self):
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+
+        self.assertEqual([limiter.acquire("a") for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire("a"), 0.5)
+
+        clock.now += 0.5
+        self.assertEqual(limiter.acquire("a"), 0.0)
+        self.assertEqual(limiter.metrics, {"allowed": 4, "rejected": 1, "failed_open": 0})
+
+    def test_clients_have_independent_buckets(self):
+        limiter = TokenBucketLimiter(rate=1, burst=1, clock=FakeClock())
+
+        self.assertEqual(limiter.acquire("a"), 0.0)
+        self.assertGreater(limiter.acquire("a"), 0.0)
+        self.assertEqual(limiter.acquire("b"), 0.0)
+
+    def test_bucket_map_is_bounded_lru(self):
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_clients=2, clock=FakeClock())
+
+        limiter.acquire("a")
+        limiter.acquire("b")
+        limiter.acquire("a")
+        limiter.acquire("c")
+
+        self.assertEqual(list(limiter._buckets), ["a", "c"])
+
+    def test_invalid_configuration_rejected(self):
+        with self.assertRaises(ValueError):
+            TokenBucketLimiter(rate=0, burst=1)
+
+
+class TestSharedTokenBucketLimiter(unittest.TestCase):
+    def test_buckets_are_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "buckets.db"
+            clock = FakeClock()
+            first = SharedTokenBucketLimiter(path, rate=1, burst=2, clock=clock)
+            second = SharedTokenBucketLimiter(path, rate=1, burst=2, clock=clock)
+
+            self.assertEqual(first.acquire("a"), 0.0)
+            self.assertEqual(second.acquire("a"), 0.0)
+            self.assertAlmostEqual(first.acquire("a"), 1.0)
+
+            clock.now += 1
+            self.assertEqual(second.acquire("a"), 0.0)
+
+    def test_locked_bucket_file_fails_open(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "buckets.db"
+            limiter = SharedTokenBucketLimiter(path, rate=1, burst=1, busy_timeout=0.05)
+            holder = sqlite3.connect(path, isolation_level=None)
+            holder.execute("BEGIN IMMEDIATE")
+            try:
+                self.assertEqual(limiter.acquire("a"), 0.0)
+                self.assertEqual(limiter.acquire("a"), 0.0)
+            finally:
+                holder.execute("ROLLBACK")
+                holder.close()
+
+            self.assertEqual(limiter.metrics, {"allowed": 0, "rejected": 0, "failed_open": 2})
+            self.assertEqual(limiter.acquire("a"), 0.0)
+            self.assertGreater(limiter.acquire("a"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Smoke test for the soak-test harness.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+class TestSoakHarness(unittest.TestCase):
+    def test_short_soak_exercises_every_path_and_passes(self):
+        from soak import build_fixture_database, run_soak
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = build_fixture_database(Path(tmpdir))
+
+            report = run_soak(
+                duration=2.0,
+                db_path=db_path,
+                warmup=0.5,
+                sample_interval=0.5,
+                max_traced_growth_mb=8.0,
+                max_rss_growth_mb=256.0,
+                max_latency_drift=10.0,
+                latency_floor_ms=250.0,
+            )
+
+        self.assertTrue(report["passed"], report["failures"])
+        self.assertGreater(report["requests"], 0)
+        self.assertTrue({200, 400, 404, 418, 422}.issubset(report["status_counts"]))
+        self.assertNotIn(429, report["status_counts"])
+        self.assertTrue(report["samples"])
+
+    def test_soak_bypasses_the_rate_limiter_without_touching_it(self):
+        from starlette.middleware import Middleware
+
+        from backend.api import main
+        from backend.api.rate_limit import RateLimitMiddleware, TokenBucketLimiter
+        from soak import build_fixture_database, run_soak
+
+        limiter = TokenBucketLimiter(rate=0.01, burst=1)
+        limiter.acquire("ip:testclient")
+        middleware = [
+            Middleware(RateLimitMiddleware, limiter=limiter, paths=main.RATE_LIMITED_PATHS)
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = build_fixture_database(Path(tmpdir))
+            with mock.patch.object(main.app, "user_middleware", middleware):
+                main.app.middleware_stack = None
+                report = run_soak(duration=0.6, db_path=db_path, warmup=0.1)
+                self.assertIs(main.app.user_middleware, middleware)
+            main.app.middleware_stack = None
+
+        self.assertNotIn(429, report["status_counts"])
+        self.assertEqual(limiter.metrics, {"allowed": 1, "rejected": 0, "failed_open": 0})
+
+    def test_fuzz_bodies_include_non_object_json_and_non_string_zips(self):
+        import json
+        import random
+
+        from soak import fuzz_body
+
+        rng = random.Random(0)
+        decoded = []
+        for _ in range(500):
+            try:
+                decoded.append(json.loads(fuzz_body(rng, {"zip": "02138"})))
+            except ValueError:
+                continue
+
+        self.assertTrue(any(not isinstance(body, dict) for body in decoded))
+        self.assertTrue(
+            any(
+                isinstance(body, dict) and "zip" in body and not isinstance(body["zip"], str)
+                for body in decoded
+            )
+        )
+
+    def test_duration_shorter_than_warmup_is_rejected(self):
+        from soak import build_fixture_database, run_soak
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = build_fixture_database(Path(tmpdir))
+
+            with self.assertRaises(ValueError):
+                run_soak(duration=0.1, db_path=db_path, warmup=1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()